@@ -5,14 +5,35 @@ Defense Aviation Inventory Management System
 Endpoints:
 - GET  /api/suppliers - Supplier network data
 - GET  /api/inventory - Current inventory levels
+- PATCH /api/inventory - Batch update inventory records
+- PUT/PATCH /api/inventory/<id> - Replace / update one inventory record
+- PATCH /api/suppliers - Batch update supplier records
+- PUT/PATCH /api/suppliers/<id> - Replace / update one supplier record
 - GET  /api/make-vs-buy - Procurement strategy
 - POST /api/ml-predict - Run ML procurement analysis
+- POST /api/jobs - Submit long-running ML analysis job
+- GET  /api/jobs/<id> - Poll job progress and partial results
+- GET  /api/jobs/<id>/events - Stream job progress (Server-Sent Events)
+- DELETE /api/jobs/<id> - Cancel a job
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from ml_engine import MLSimulationEngine
+from jobs import JobManager, FINISHED_STATES
+from inventory_store import InventoryStore, VersionConflict, VersionedCache
+from result_delta import (
+    BINARY_MIMETYPE, ENCODINGS, ResultCache,
+    build_response, encode_binary, encode_columnar, hash_rows,
+)
+import numpy as np
+import atexit
+import hashlib
 import json
+import math
+import os
+import shutil
+import tempfile
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
@@ -20,6 +41,27 @@ CORS(app)  # Enable CORS for React frontend
 # Initialize ML engine
 ml_engine = MLSimulationEngine()
 
+# Directory for state shared by every worker process (jobs, inventory
+# versions, delta result hashes). The pre-fork launcher sets it; a
+# standalone server uses a temporary directory removed on exit.
+STATE_DIR = os.environ.get('SABERWING_STATE_DIR')
+if not STATE_DIR:
+    STATE_DIR = tempfile.mkdtemp(prefix='saberwing-state-')
+    atexit.register(shutil.rmtree, STATE_DIR, ignore_errors=True)
+
+# Background job queue for analyses that outlive an HTTP request
+job_manager = JobManager(
+    path=os.path.join(STATE_DIR, 'jobs.sqlite3'),
+    max_workers=2,
+    ttl_seconds=3600,
+)
+
+# Row hashes of recent /api/ml-predict results, for delta responses
+result_cache = ResultCache(
+    path=os.path.join(STATE_DIR, 'results.sqlite3'),
+    max_entries=256,
+)
+
 # =========================================================================
 # DATA MODELS
 # =========================================================================
@@ -273,6 +315,236 @@ INVENTORY_ITEMS = [
     },
 ]
 
+# Versioned copy-on-write store; the constants above are the seed data
+inventory_store = InventoryStore(
+    INVENTORY_ITEMS,
+    SUPPLIERS,
+    path=os.path.join(STATE_DIR, 'inventory.sqlite3'),
+)
+
+# /api/ml-predict results per (inventory version, normalized macroParams)
+prediction_cache = VersionedCache(max_entries=128)
+
+# =========================================================================
+# HELPERS
+# =========================================================================
+
+def is_number(value):
+    """True for finite int/float values (bool excluded)"""
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+def validate_macro_params(macro_params):
+    """Return an error message for malformed or out-of-range macro parameters, or None"""
+    
+    if not isinstance(macro_params, dict):
+        return 'macroParams must be an object'
+    
+    for name in ('conflictIndex', 'inflationRate', 'defenseBudget', 'flightHours'):
+        if name in macro_params and not is_number(macro_params[name]):
+            return f'{name} must be a number'
+    
+    if 'testPhase' in macro_params and not isinstance(macro_params['testPhase'], str):
+        return 'testPhase must be a string'
+    
+    conflict_index = macro_params.get('conflictIndex', 5)
+    if not (1 <= conflict_index <= 10):
+        return 'conflictIndex must be between 1 and 10'
+    
+    inflation_rate = macro_params.get('inflationRate', 3.0)
+    if not (0 <= inflation_rate <= 15):
+        return 'inflationRate must be between 0 and 15'
+    
+    defense_budget = macro_params.get('defenseBudget', 100.0)
+    if not (50 <= defense_budget <= 200):
+        return 'defenseBudget must be between 50 and 200'
+    
+    return None
+
+def normalize_macro_params(macro_params):
+    """Fill engine defaults and canonicalise numbers so equal inputs compare equal"""
+    
+    return {
+        'conflictIndex': float(macro_params.get('conflictIndex', 5)),
+        'inflationRate': float(macro_params.get('inflationRate', 3.0)),
+        'defenseBudget': float(macro_params.get('defenseBudget', 100.0)),
+        'flightHours': float(macro_params.get('flightHours', 250)),
+        'testPhase': macro_params.get('testPhase', 'Normal'),
+    }
+
+def prediction_seed(macro_params, run=0):
+    """
+    Seed for the engine's simulated variance
+    
+    Derived from the normalized macro parameters (and Monte Carlo run
+    index), so identical requests reproduce identical predictions.
+    """
+    
+    payload = json.dumps([normalize_macro_params(macro_params), run], sort_keys=True)
+    return int.from_bytes(hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def ml_analysis_job(job, snapshot):
+    """
+    Job body for chunked ML analysis (single run or Monte Carlo study)
+    
+    Runs the 3-tier pipeline over the inventory snapshot pinned at
+    submission time in chunks of chunkSize items. A single run yields
+    each chunk's predictions as a partial result; a Monte Carlo study
+    (runs > 1) yields only each run's summary, so stored partials stay
+    small however large the study is.
+    """
+    
+    macro_params = job.params['macroParams']
+    runs = job.params['runs']
+    chunk_size = job.params['chunkSize']
+    items = snapshot.inventory
+    
+    total = runs * len(items)
+    completed = 0
+    summaries = []
+    predictions = []
+    
+    for run in range(runs):
+        predictions = []
+        for start in range(0, len(items), chunk_size):
+            job.check_cancelled()
+            chunk = ml_engine.run_full_analysis(
+                inventory_items=items[start:start + chunk_size],
+                macro_params=macro_params,
+                seed=prediction_seed(macro_params, run)
+            )
+            predictions.extend(chunk)
+            completed += len(chunk)
+            update = {'completed': completed, 'total': total}
+            if runs == 1:
+                update['partial'] = {'run': run, 'predictions': chunk}
+            yield update
+        
+        summary = ml_engine.calculate_summary(predictions)
+        summaries.append(summary)
+        if runs > 1:
+            yield {'partial': {'run': run, 'summary': summary}}
+    
+    result = {
+        'predictions': predictions,
+        'summary': summaries[-1],
+        'macroParams': macro_params,
+        'inventoryVersion': snapshot.version,
+    }
+    
+    if runs > 1:
+        result['monteCarlo'] = {
+            'runs': runs,
+            'statistics': {
+                key: {
+                    'mean': float(np.mean([s[key] for s in summaries])),
+                    'p10': float(np.percentile([s[key] for s in summaries], 10)),
+                    'p90': float(np.percentile([s[key] for s in summaries], 90)),
+                }
+                for key in summaries[0]
+            },
+        }
+    
+    yield {'completed': completed, 'total': total, 'result': result}
+
+def apply_record_changes(kind, changes, replace=False):
+    """
+    Publish a batch of inventory or supplier changes as a new version
+    
+    Honours an If-Match header (or "expectedVersion" in the body) for
+    optimistic concurrency. Returns a Flask response tuple.
+    """
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    
+    if 'If-Match' in request.headers:
+        expected_version = parse_if_match(request.headers['If-Match'])
+        if expected_version is False:
+            return jsonify({'error': 'If-Match must list version ETags such as "3" or be *'}), 400
+    else:
+        expected_version = data.get('expectedVersion')
+        if expected_version is not None and (
+            not isinstance(expected_version, int) or isinstance(expected_version, bool)
+        ):
+            return jsonify({'error': 'expectedVersion must be an integer'}), 400
+    
+    try:
+        if kind == 'inventory':
+            snapshot = inventory_store.apply(
+                inventory_changes=changes,
+                replace=replace,
+                expected_version=expected_version,
+            )
+        else:
+            snapshot = inventory_store.apply(
+                supplier_changes=changes,
+                replace=replace,
+                expected_version=expected_version,
+            )
+    except KeyError as e:
+        return jsonify({'error': f'Unknown {kind} record: {e.args[0]}'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except VersionConflict as e:
+        return jsonify({'error': str(e), 'version': e.current}), 409
+    
+    by_id = snapshot.inventory_by_id if kind == 'inventory' else snapshot.suppliers_by_id
+    updated_ids = dict.fromkeys(change['id'] for change in changes)
+    response = jsonify({
+        'version': snapshot.version,
+        'updated': [by_id[record_id] for record_id in updated_ids],
+    })
+    response.headers['ETag'] = f'"{snapshot.version}"'
+    return response, 200
+
+def parse_if_match(header):
+    """
+    Parse an If-Match header into acceptable snapshot versions
+    
+    Returns None for '*' (any version), a tuple of versions for a list of
+    (optionally weak) ETags, or False when the header is malformed.
+    """
+    
+    if header.strip() == '*':
+        return None
+    
+    versions = []
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if not tag.isdigit():
+            return False
+        versions.append(int(tag))
+    return tuple(versions)
+
+def batch_changes_from_request():
+    """Extract the list of record changes from a batch PATCH body"""
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('updates'), list) or not data['updates']:
+        return None
+    if not all(isinstance(change, dict) and isinstance(change.get('id'), str) for change in data['updates']):
+        return None
+    return data['updates']
+
+def single_change_from_request(record_id):
+    """Build a one-record change list from a PUT/PATCH body"""
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None
+    if data.get('id', record_id) != record_id:
+        return None
+    data = {k: v for k, v in data.items() if k != 'expectedVersion'}
+    return [dict(data, id=record_id)]
+
 # =========================================================================
 # API ENDPOINTS
 # =========================================================================
@@ -285,36 +557,99 @@ def home():
         'service': 'SaberWing Command API',
         'version': '2.0',
         'endpoints': [
-            '/api/suppliers',
-            '/api/inventory',
+            '/api/suppliers [GET, PATCH]',
+            '/api/suppliers/<id> [PUT, PATCH]',
+            '/api/inventory [GET, PATCH]',
+            '/api/inventory/<id> [PUT, PATCH]',
             '/api/make-vs-buy',
             '/api/ml-predict [POST]',
+            '/api/jobs [POST]',
+            '/api/jobs/<id> [GET, DELETE]',
+            '/api/jobs/<id>/events [GET]',
         ]
     })
 
 @app.route('/api/suppliers', methods=['GET'])
 def get_suppliers():
     """Get supplier network data for graph visualization"""
+    
+    snapshot = inventory_store.current()
+    
     return jsonify({
-        'suppliers': SUPPLIERS,
-        'totalContractValue': sum(s['contractValue'] for s in SUPPLIERS),
+        'suppliers': list(snapshot.suppliers),
+        'totalContractValue': snapshot.total_contract_value,
+        'version': snapshot.version,
     })
 
+@app.route('/api/suppliers', methods=['PATCH'])
+def patch_suppliers():
+    """
+    Batch update supplier records as a single new version
+    
+    Request body:
+    {
+        "updates": [{"id": "ge", "leadTime": 20}, ...],
+        "expectedVersion": 3      # optional, or If-Match header
+    }
+    """
+    
+    changes = batch_changes_from_request()
+    if changes is None:
+        return jsonify({'error': 'Body must contain a non-empty updates list of records with ids'}), 400
+    
+    return apply_record_changes('suppliers', changes)
+
+@app.route('/api/suppliers/<supplier_id>', methods=['PUT', 'PATCH'])
+def update_supplier(supplier_id):
+    """Replace (PUT) or partially update (PATCH) one supplier record"""
+    
+    changes = single_change_from_request(supplier_id)
+    if changes is None:
+        return jsonify({'error': 'Body must be a JSON object matching the record id'}), 400
+    
+    return apply_record_changes('suppliers', changes, replace=request.method == 'PUT')
+
 @app.route('/api/inventory', methods=['GET'])
 def get_inventory():
     """Get current inventory levels"""
     
-    total_value = sum(
-        item['currentStock'] * item['unitCost'] 
-        for item in INVENTORY_ITEMS
-    )
+    snapshot = inventory_store.current()
     
     return jsonify({
-        'inventory': INVENTORY_ITEMS,
-        'totalInventoryValue': total_value,
-        'itemCount': len(INVENTORY_ITEMS),
+        'inventory': list(snapshot.inventory),
+        'totalInventoryValue': snapshot.total_inventory_value,
+        'itemCount': len(snapshot.inventory),
+        'version': snapshot.version,
     })
 
+@app.route('/api/inventory', methods=['PATCH'])
+def patch_inventory():
+    """
+    Batch update inventory records as a single new version
+    
+    Request body:
+    {
+        "updates": [{"id": "engines", "currentStock": 50}, ...],
+        "expectedVersion": 3      # optional, or If-Match header
+    }
+    """
+    
+    changes = batch_changes_from_request()
+    if changes is None:
+        return jsonify({'error': 'Body must contain a non-empty updates list of records with ids'}), 400
+    
+    return apply_record_changes('inventory', changes)
+
+@app.route('/api/inventory/<item_id>', methods=['PUT', 'PATCH'])
+def update_inventory_item(item_id):
+    """Replace (PUT) or partially update (PATCH) one inventory record"""
+    
+    changes = single_change_from_request(item_id)
+    if changes is None:
+        return jsonify({'error': 'Body must be a JSON object matching the record id'}), 400
+    
+    return apply_record_changes('inventory', changes, replace=request.method == 'PUT')
+
 @app.route('/api/make-vs-buy', methods=['GET'])
 def get_make_vs_buy():
     """Get procurement strategy (Make vs Buy decisions)"""
@@ -344,8 +679,13 @@ def ml_predict():
             "defenseBudget": 120,
             "flightHours": 350,
             "testPhase": "High-G"
-        }
+        },
+        "baseResultId": "...",    # optional, resultId of the client's last result
+        "encoding": "json"        # optional, 'json', 'columnar' or 'binary'
     }
+    
+    When baseResultId is still cached the response is a delta holding
+    only changed rows ("delta": true), otherwise the full result.
     """
     
     try:
@@ -357,36 +697,171 @@ def ml_predict():
         macro_params = data['macroParams']
         
         # Validate parameters
-        conflict_index = macro_params.get('conflictIndex', 5)
-        if not (1 <= conflict_index <= 10):
-            return jsonify({'error': 'conflictIndex must be between 1 and 10'}), 400
+        error = validate_macro_params(macro_params)
+        if error:
+            return jsonify({'error': error}), 400
         
-        inflation_rate = macro_params.get('inflationRate', 3.0)
-        if not (0 <= inflation_rate <= 15):
-            return jsonify({'error': 'inflationRate must be between 0 and 15'}), 400
+        encoding = data.get('encoding', 'json')
+        if encoding not in ENCODINGS:
+            return jsonify({'error': f"encoding must be one of: {', '.join(ENCODINGS)}"}), 400
         
-        defense_budget = macro_params.get('defenseBudget', 100.0)
-        if not (50 <= defense_budget <= 200):
-            return jsonify({'error': 'defenseBudget must be between 50 and 200'}), 400
+        # Run ML analysis against a pinned inventory snapshot, reusing the
+        # result for identical inputs until the inventory version changes
+        snapshot = inventory_store.current()
+        cache_params = json.dumps(normalize_macro_params(macro_params), sort_keys=True)
+        cached = prediction_cache.get(snapshot, cache_params)
         
-        # Run ML analysis
-        predictions = ml_engine.run_full_analysis(
-            inventory_items=INVENTORY_ITEMS,
-            macro_params=macro_params
+        if cached is None:
+            predictions = ml_engine.run_full_analysis(
+                inventory_items=snapshot.inventory,
+                macro_params=macro_params,
+                seed=prediction_seed(macro_params)
+            )
+            
+            # Calculate summary statistics
+            summary = ml_engine.calculate_summary(predictions)
+            row_hashes = hash_rows(predictions)
+            prediction_cache.put(snapshot, (predictions, summary, row_hashes), cache_params)
+        else:
+            predictions, summary, row_hashes = cached
+        
+        payload = build_response(
+            predictions,
+            summary,
+            cache=result_cache,
+            base_result_id=data.get('baseResultId'),
+            row_hashes=row_hashes,
         )
+        payload['macroParams'] = macro_params
+        payload['inventoryVersion'] = snapshot.version
         
-        # Calculate summary statistics
-        summary = ml_engine.calculate_summary(predictions)
+        if encoding == 'binary':
+            return Response(encode_binary(payload), mimetype=BINARY_MIMETYPE)
+        if encoding == 'columnar':
+            payload = encode_columnar(payload)
         
-        return jsonify({
-            'predictions': predictions,
-            'summary': summary,
-            'macroParams': macro_params,
-        })
+        return jsonify(payload)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Submit an ML analysis as a background job
+    
+    Request body:
+    {
+        "macroParams": {...},     # same as /api/ml-predict
+        "runs": 100,              # optional, Monte Carlo iterations (1-1000)
+        "chunkSize": 2            # optional, items per progress update
+    }
+    
+    Returns 202 with the job id; poll /api/jobs/<id> or subscribe to
+    /api/jobs/<id>/events for progress and partial results.
+    """
+    
+    data = request.get_json(silent=True)
+    
+    if not data or 'macroParams' not in data:
+        return jsonify({'error': 'Missing macroParams in request'}), 400
+    
+    macro_params = data['macroParams']
+    error = validate_macro_params(macro_params)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    runs = data.get('runs', 1)
+    if not isinstance(runs, int) or isinstance(runs, bool) or not (1 <= runs <= 1000):
+        return jsonify({'error': 'runs must be an integer between 1 and 1000'}), 400
+    
+    chunk_size = data.get('chunkSize', 1)
+    if not isinstance(chunk_size, int) or isinstance(chunk_size, bool) or chunk_size < 1:
+        return jsonify({'error': 'chunkSize must be a positive integer'}), 400
+    
+    snapshot = inventory_store.current()
+    job = job_manager.submit(
+        kind='ml-predict',
+        params={
+            'macroParams': macro_params,
+            'runs': runs,
+            'chunkSize': chunk_size,
+        },
+        fn=lambda job: ml_analysis_job(job, snapshot),
+    )
+    
+    return jsonify({
+        'jobId': job.id,
+        'status': job.status,
+        'statusUrl': f'/api/jobs/{job.id}',
+        'eventsUrl': f'/api/jobs/{job.id}/events',
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Poll job status, progress, partial results and final result
+    
+    Pass ?since=<partialCursor> from the previous poll to receive only
+    the partial results published since then.
+    """
+    
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    since = request.args.get('since', 0, type=int)
+    
+    return jsonify(job.to_dict(since=since))
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a pending or running job"""
+    
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    return jsonify(job.to_dict(include_partial=False))
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Stream job progress as Server-Sent Events
+    
+    Emits a 'progress' event whenever the job changes, carrying only the
+    partial results produced since the previous event, and a final 'done'
+    event with the job's terminal state.
+    """
+    
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    def stream():
+        version = -1
+        cursor = 0
+        while True:
+            version = job_manager.wait_for_change(job_id, version, timeout=15.0)
+            current = job_manager.get(job_id)
+            if current is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Job expired'})}\n\n"
+                return
+            
+            snapshot = current.to_dict(since=cursor)
+            cursor = snapshot['partialCursor']
+            
+            if snapshot['status'] in FINISHED_STATES:
+                yield f"event: done\ndata: {json.dumps(snapshot)}\n\n"
+                return
+            
+            yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
 # =========================================================================
 # MAIN
 # =========================================================================
@@ -399,4 +874,4 @@ if __name__ == '__main__':
     print("🧠 ML Engine: 3-Tier Simulation Ready")
     print("="*60 + "\n")
     
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    app.run(host='0.0.0.0', port=5001, debug=True, threaded=True)
@@ -0,0 +1,418 @@
+"""
+SaberWing Command - Versioned Inventory Store
+Copy-on-write snapshots of inventory and supplier records
+
+Readers pin the current Snapshot with a single attribute read and never
+take a lock; a pinned snapshot stays consistent for as long as it is
+held. Writers apply a batch of record changes to private copies under a
+writer lock and publish the result as a new snapshot version atomically.
+Given a database path, versions are committed to SQLite so every worker
+process shares them and a restarted worker resumes at the latest one.
+Derived indexes and cached values live on the snapshot itself, and
+longer-lived caches key their entries by snapshot version, so both are
+invalidated simply by the version changing.
+"""
+
+import copy
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from state_db import StateDatabase
+
+
+INVENTORY_FIELDS = {
+    'component': str,
+    'supplier': str,
+    'currentStock': int,
+    'minStock': int,
+    'unitCost': (int, float),
+    'storageCostPerDay': (int, float),
+    'leadTimeBase': int,
+    'criticality': str,
+}
+
+SUPPLIER_FIELDS = {
+    'name': str,
+    'component': str,
+    'unitCost': (int, float),
+    'leadTime': int,
+    'status': str,
+    'contractValue': (int, float),
+    'location': str,
+}
+
+CRITICALITY_LEVELS = ('high', 'medium', 'low')
+
+# Upper bound for any numeric field (stock counts, costs, contract values);
+# keeps every derived total a finite float
+MAX_NUMERIC_VALUE = 10 ** 15
+
+
+class VersionConflict(Exception):
+    """Raised when a write expects a version that is no longer current"""
+
+    def __init__(self, expected: Union[int, Collection[int]], current: int):
+        expected_text = expected if isinstance(expected, int) else ' or '.join(map(str, sorted(expected)))
+        super().__init__(f'expected version {expected_text}, current version is {current}')
+        self.expected = expected
+        self.current = current
+
+
+class Snapshot:
+    """
+    Immutable view of inventory and supplier records at one version
+
+    Records must be treated as read-only; writers always copy before
+    changing anything. Derived values are memoised per snapshot.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        inventory: Tuple[Dict[str, Any], ...],
+        suppliers: Tuple[Dict[str, Any], ...],
+    ):
+        self.version = version
+        self.inventory = inventory
+        self.suppliers = suppliers
+        self.inventory_by_id = {item['id']: item for item in inventory}
+        self.suppliers_by_id = {supplier['id']: supplier for supplier in suppliers}
+        self._derived: Dict[str, Any] = {}
+
+    def derived(self, name: str, compute: Callable[['Snapshot'], Any]) -> Any:
+        """Return a value computed once per snapshot version"""
+        try:
+            return self._derived[name]
+        except KeyError:
+            value = compute(self)
+            self._derived[name] = value
+            return value
+
+    def cache_key(self, *parts: Any) -> Tuple[Any, ...]:
+        """Build a cache key that is invalidated when the version changes"""
+        return (self.version,) + parts
+
+    @property
+    def total_inventory_value(self) -> float:
+        return self.derived('totalInventoryValue', lambda s: sum(
+            item['currentStock'] * item['unitCost'] for item in s.inventory
+        ))
+
+    @property
+    def total_contract_value(self) -> float:
+        return self.derived('totalContractValue', lambda s: sum(
+            supplier['contractValue'] for supplier in s.suppliers
+        ))
+
+
+def _validate_fields(
+    changes: Dict[str, Any],
+    schema: Dict[str, Any],
+    require_all: bool,
+) -> None:
+    unknown = set(changes) - set(schema) - {'id'}
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+
+    if require_all:
+        missing = set(schema) - set(changes)
+        if missing:
+            raise ValueError(f"missing fields: {', '.join(sorted(missing))}")
+
+    for field, value in changes.items():
+        if field == 'id':
+            continue
+        expected = schema[field]
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError(f'{field} has invalid type')
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f'{field} must be a finite number')
+        if isinstance(value, (int, float)) and value < 0:
+            raise ValueError(f'{field} must not be negative')
+        if isinstance(value, (int, float)) and value > MAX_NUMERIC_VALUE:
+            raise ValueError(f'{field} must not exceed {MAX_NUMERIC_VALUE:.0e}')
+
+
+def _validate_inventory(changes: Dict[str, Any], require_all: bool) -> None:
+    _validate_fields(changes, INVENTORY_FIELDS, require_all)
+    if 'criticality' in changes and changes['criticality'] not in CRITICALITY_LEVELS:
+        raise ValueError(f"criticality must be one of: {', '.join(CRITICALITY_LEVELS)}")
+    if 'minStock' in changes and changes['minStock'] < 1:
+        raise ValueError('minStock must be at least 1')
+
+
+def _validate_supplier(changes: Dict[str, Any], require_all: bool) -> None:
+    _validate_fields(changes, SUPPLIER_FIELDS, require_all)
+
+
+def _open_counter(path: str) -> mmap.mmap:
+    """Map an 8-byte file shared by every process that opens the same path"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if os.fstat(fd).st_size < 8:
+            os.ftruncate(fd, 8)
+        return mmap.mmap(fd, 8)
+    finally:
+        os.close(fd)
+
+
+class VersionedCache:
+    """
+    Bounded LRU cache keyed by Snapshot.cache_key
+
+    Entries are only ever hit for the snapshot version they were stored
+    under; publishing a newer version drops every older entry on the
+    next write.
+
+    Args:
+        max_entries: Maximum number of cached values
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[Any, ...], Any]' = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, snapshot: Snapshot, *parts: Any) -> Any:
+        key = snapshot.cache_key(*parts)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, snapshot: Snapshot, value: Any, *parts: Any) -> None:
+        with self._lock:
+            if snapshot.version > self._version:
+                self._version = snapshot.version
+                for key in [k for k in self._entries if k[0] < snapshot.version]:
+                    del self._entries[key]
+            elif snapshot.version < self._version:
+                # A reader pinned an older snapshot; its result is already stale
+                return
+
+            key = snapshot.cache_key(*parts)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+INVENTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    version INTEGER PRIMARY KEY,
+    inventory TEXT NOT NULL,
+    suppliers TEXT NOT NULL
+);
+"""
+
+# Published versions kept in the database (older ones are pruned)
+RETAINED_VERSIONS = 100
+
+
+class InventoryStore:
+    """
+    Holder of the current Snapshot with batched copy-on-write updates
+
+    Without a path the store lives in process memory. With a path every
+    version is committed to SQLite and the latest version number is
+    mirrored in a small memory-mapped counter file next to it; all
+    processes using the same path (e.g. forked workers) share it.
+    Readers compare that counter with their cached snapshot without
+    locking and reload only when another process has published.
+
+    Args:
+        inventory: Initial inventory records (used when the database is empty)
+        suppliers: Initial supplier records (used when the database is empty)
+        path: Optional SQLite database path for cross-process sharing
+    """
+
+    def __init__(
+        self,
+        inventory: Iterable[Dict[str, Any]],
+        suppliers: Iterable[Dict[str, Any]],
+        path: Optional[str] = None,
+    ):
+        self._write_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._db: Optional[StateDatabase] = None
+        self._counter: Optional[mmap.mmap] = None
+        self._snapshot = Snapshot(
+            version=1,
+            inventory=tuple(copy.deepcopy(list(inventory))),
+            suppliers=tuple(copy.deepcopy(list(suppliers))),
+        )
+
+        if path is None:
+            return
+
+        self._db = StateDatabase(path, INVENTORY_SCHEMA)
+        self._counter = _open_counter(path + '.version')
+        with self._db.write() as conn:
+            latest = self._load_latest(conn)
+            if latest is None:
+                self._insert(conn, self._snapshot)
+            else:
+                self._snapshot = latest
+            self._set_shared_version(self._snapshot.version)
+
+    def current(self) -> Snapshot:
+        """Pin the latest snapshot (lock-free unless another process published)"""
+        snapshot = self._snapshot
+        if self._counter is not None and self._shared_version() != snapshot.version:
+            snapshot = self._refresh()
+        return snapshot
+
+    @property
+    def version(self) -> int:
+        return self.current().version
+
+    def apply(
+        self,
+        inventory_changes: Optional[List[Dict[str, Any]]] = None,
+        supplier_changes: Optional[List[Dict[str, Any]]] = None,
+        replace: bool = False,
+        expected_version: Optional[Union[int, Collection[int]]] = None,
+    ) -> Snapshot:
+        """
+        Apply a batch of record changes and publish a new version
+
+        Each change is a dict with the record 'id' plus the fields to
+        update. With replace=True every field must be supplied (PUT
+        semantics). The whole batch is validated before anything is
+        published, so readers see either all of it or none of it.
+        expected_version may be a single version or a collection of
+        acceptable versions (as listed in an If-Match header).
+
+        Raises:
+            KeyError: A change references an unknown record id
+            ValueError: A change contains invalid fields or values
+            VersionConflict: expected_version is no longer current
+        """
+
+        inventory_changes = inventory_changes or []
+        supplier_changes = supplier_changes or []
+
+        with self._write_lock, self._transaction() as conn:
+            base = self._snapshot
+            if conn is not None:
+                latest = self._load_latest(conn)
+                if latest.version != base.version:
+                    base = latest
+
+            if expected_version is not None:
+                acceptable = {expected_version} if isinstance(expected_version, int) else set(expected_version)
+                if base.version not in acceptable:
+                    raise VersionConflict(expected_version, base.version)
+
+            inventory = self._merge(
+                base.inventory, base.inventory_by_id, inventory_changes,
+                _validate_inventory, replace,
+            )
+            suppliers = self._merge(
+                base.suppliers, base.suppliers_by_id, supplier_changes,
+                _validate_supplier, replace,
+            )
+
+            if inventory is base.inventory and suppliers is base.suppliers:
+                self._snapshot = base
+                return base
+
+            snapshot = Snapshot(base.version + 1, inventory, suppliers)
+            if conn is not None:
+                self._insert(conn, snapshot)
+                conn.execute(
+                    'DELETE FROM snapshots WHERE version <= ?',
+                    (snapshot.version - RETAINED_VERSIONS,),
+                )
+                # Bumped inside the transaction so versions publish in commit order
+                self._set_shared_version(snapshot.version)
+            self._snapshot = snapshot
+            return snapshot
+
+    @contextmanager
+    def _transaction(self) -> Iterator[Optional[sqlite3.Connection]]:
+        if self._db is None:
+            yield None
+        else:
+            with self._db.write() as conn:
+                yield conn
+
+    def _refresh(self) -> Snapshot:
+        with self._reload_lock:
+            latest = self._load_latest(self._db.connection())
+            if latest is not None and latest.version > self._snapshot.version:
+                self._snapshot = latest
+            return self._snapshot
+
+    def _shared_version(self) -> int:
+        return struct.unpack_from('<q', self._counter)[0]
+
+    def _set_shared_version(self, version: int) -> None:
+        struct.pack_into('<q', self._counter, 0, version)
+
+    @staticmethod
+    def _load_latest(conn: sqlite3.Connection) -> Optional[Snapshot]:
+        row = conn.execute(
+            'SELECT version, inventory, suppliers FROM snapshots ORDER BY version DESC LIMIT 1'
+        ).fetchone()
+        if row is None:
+            return None
+        return Snapshot(
+            row['version'],
+            tuple(json.loads(row['inventory'])),
+            tuple(json.loads(row['suppliers'])),
+        )
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, snapshot: Snapshot) -> None:
+        conn.execute(
+            'INSERT INTO snapshots (version, inventory, suppliers) VALUES (?, ?, ?)',
+            (snapshot.version, json.dumps(snapshot.inventory), json.dumps(snapshot.suppliers)),
+        )
+
+    @staticmethod
+    def _merge(
+        records: Tuple[Dict[str, Any], ...],
+        by_id: Dict[str, Dict[str, Any]],
+        changes: List[Dict[str, Any]],
+        validate: Callable[[Dict[str, Any], bool], None],
+        replace: bool,
+    ) -> Tuple[Dict[str, Any], ...]:
+        if not changes:
+            return records
+
+        updated: Dict[str, Dict[str, Any]] = {}
+        for change in changes:
+            record_id = change.get('id')
+            if not isinstance(record_id, str):
+                raise ValueError('id must be a string')
+            if record_id not in by_id:
+                raise KeyError(record_id)
+            validate(change, replace)
+
+            # Copy on first touch; unchanged records are shared between versions
+            record = updated.get(record_id)
+            if record is None:
+                record = {'id': record_id} if replace else dict(by_id[record_id])
+                updated[record_id] = record
+            record.update(change)
+
+        # Drop no-op changes so an empty or identical write keeps the version
+        updated = {
+            record_id: record for record_id, record in updated.items()
+            if record != by_id[record_id]
+        }
+        if not updated:
+            return records
+
+        return tuple(updated.get(record['id'], record) for record in records)
@@ -0,0 +1,320 @@
+"""
+SaberWing Command - Asynchronous Job Manager
+Background execution for long-running ML analyses
+
+Jobs are generator functions that yield progress updates between chunks
+of work. The submitting process runs them on a small worker pool while
+their status, progress, partial results and cancellation flag live in
+SQLite, so any worker process can poll, stream or cancel any job.
+Finished jobs expire after a TTL; jobs whose owning process died are
+reported as failed instead of disappearing.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from state_db import StateDatabase
+
+
+# Job lifecycle states
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    partials INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    version INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner_pid INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_partials (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested"""
+
+
+class Job:
+    """
+    View of a single background job as stored at load time
+
+    The job function receives the Job and yields dicts of the form
+    {'completed': int, 'total': int, 'partial': Any}. Every yield is a
+    cancellation checkpoint and publishes a new progress event.
+
+    Partial results are append-only; readers fetch them by cursor (the
+    number of partials already seen) so polls only carry new entries.
+    """
+
+    def __init__(self, manager: 'JobManager', row: Any, params: Optional[Dict[str, Any]] = None):
+        self._manager = manager
+        self.id = row['id']
+        self.kind = row['kind']
+        self.params = params
+        self.status = row['status']
+        self.completed = row['completed']
+        self.total = row['total']
+        self.partials = row['partials']
+        self.result = json.loads(row['result']) if row['result'] is not None else None
+        self.error = row['error']
+        self.created_at = row['created_at']
+        self.finished_at = row['finished_at']
+        self.version = row['version']
+
+    def check_cancelled(self) -> None:
+        """Checkpoint for job functions doing work between yields"""
+        if self._manager._cancel_requested(self.id):
+            raise JobCancelled()
+
+    def to_dict(self, include_partial: bool = True, since: int = 0) -> Dict[str, Any]:
+        """
+        Serialise the job; with include_partial the partial results after
+        cursor `since` are included along with the next cursor
+        """
+        data = {
+            'jobId': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': {
+                'completed': self.completed,
+                'total': self.total,
+                'percent': round(100.0 * self.completed / self.total, 1) if self.total else 0.0,
+            },
+            'createdAt': self.created_at,
+            'finishedAt': self.finished_at,
+            'version': self.version,
+            'partialCursor': self.partials,
+        }
+        if include_partial:
+            data['partial'] = self._manager._partials(self.id, since, self.partials)
+        if self.status == COMPLETED:
+            data['result'] = self.result
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    """
+    SQLite-backed job queue executed on a per-process thread pool
+
+    Args:
+        path: SQLite database shared by every worker process; defaults
+            to a private temporary file
+        max_workers: Number of jobs this process may run concurrently
+        ttl_seconds: How long finished jobs are kept before expiring
+        poll_interval: Seconds between checks for changes made by other
+            processes while waiting on a job
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_workers: int = 2,
+        ttl_seconds: float = 3600.0,
+        poll_interval: float = 0.2,
+    ):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='saberwing-jobs-', suffix='.sqlite3')
+            os.close(fd)
+
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self._db = StateDatabase(path, JOBS_SCHEMA)
+        self._changed = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='saberwing-job',
+        )
+
+    def submit(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        fn: Callable[[Job], Iterator[Dict[str, Any]]],
+    ) -> Job:
+        """Queue a job function and return its Job handle immediately"""
+        self.expire()
+
+        job_id = uuid.uuid4().hex
+        with self._db.write() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, status, created_at, owner_pid) VALUES (?, ?, ?, ?, ?)',
+                (job_id, kind, PENDING, time.time(), os.getpid()),
+            )
+            job = Job(self, self._row(conn, job_id), params)
+
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.expire()
+        conn = self._db.connection()
+        row = self._row(conn, job_id)
+        if row is None:
+            return None
+
+        if row['status'] not in FINISHED_STATES and not _process_alive(row['owner_pid']):
+            self._publish(
+                job_id,
+                status=FAILED,
+                error='worker process exited before the job finished',
+                finished_at=time.time(),
+            )
+            row = self._row(conn, job_id)
+        return Job(self, row)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Request cancellation of a job
+
+        Pending jobs are cancelled before they start; running jobs stop at
+        their next checkpoint (in whichever process runs them). Finished
+        jobs are returned unchanged.
+        """
+        with self._db.write() as conn:
+            row = self._row(conn, job_id)
+            if row is None:
+                return None
+            if row['status'] not in FINISHED_STATES:
+                conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+            if row['status'] == PENDING:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, finished_at = ?, version = version + 1 WHERE id = ?',
+                    (CANCELLED, time.time(), job_id),
+                )
+        self._notify()
+        return self.get(job_id)
+
+    def expire(self) -> int:
+        """Drop finished jobs older than the TTL, returning how many were removed"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._db.write() as conn:
+            conn.execute(
+                'DELETE FROM job_partials WHERE job_id IN '
+                '(SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?)',
+                (cutoff,),
+            )
+            return conn.execute(
+                'DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?',
+                (cutoff,),
+            ).rowcount
+
+    def wait_for_change(self, job_id: str, last_version: int, timeout: float) -> int:
+        """
+        Block until the job changes past last_version, finishes, or the
+        timeout expires; returns the current version (-1 once expired)
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            row = self._db.connection().execute(
+                'SELECT version, status FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+            if row is None:
+                return -1
+            remaining = deadline - time.monotonic()
+            if row['version'] != last_version or row['status'] in FINISHED_STATES or remaining <= 0:
+                return row['version']
+            with self._changed:
+                self._changed.wait(min(self.poll_interval, remaining))
+
+    # =========================================================================
+    # INTERNALS
+    # =========================================================================
+
+    @staticmethod
+    def _row(conn: Any, job_id: str) -> Any:
+        return conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+    def _partials(self, job_id: str, since: int, until: int) -> List[Any]:
+        rows = self._db.connection().execute(
+            'SELECT data FROM job_partials WHERE job_id = ? AND seq >= ? AND seq < ? ORDER BY seq',
+            (job_id, max(since, 0), until),
+        ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        row = self._db.connection().execute(
+            'SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        return row is None or bool(row['cancel_requested'])
+
+    def _publish(self, job_id: str, partial: Any = None, **changes: Any) -> None:
+        if 'result' in changes:
+            changes['result'] = json.dumps(changes['result'])
+        assignments = ''.join(f'{column} = ?, ' for column in changes)
+
+        with self._db.write() as conn:
+            if partial is not None:
+                conn.execute(
+                    'INSERT INTO job_partials (job_id, seq, data) '
+                    'SELECT id, partials, ? FROM jobs WHERE id = ?',
+                    (json.dumps(partial), job_id),
+                )
+                assignments += 'partials = partials + 1, '
+            conn.execute(
+                f'UPDATE jobs SET {assignments}version = version + 1 WHERE id = ?',
+                (*changes.values(), job_id),
+            )
+        self._notify()
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def _run(self, job: Job, fn: Callable[[Job], Iterator[Dict[str, Any]]]) -> None:
+        if self._cancel_requested(job.id):
+            return
+
+        self._publish(job.id, status=RUNNING)
+        try:
+            for update in fn(job):
+                job.check_cancelled()
+                changes = {
+                    key: update[key] for key in ('completed', 'total', 'result') if key in update
+                }
+                self._publish(job.id, partial=update.get('partial'), **changes)
+            job.check_cancelled()
+            self._publish(job.id, status=COMPLETED, finished_at=time.time())
+        except JobCancelled:
+            self._publish(job.id, status=CANCELLED, finished_at=time.time())
+        except Exception as e:
+            self._publish(job.id, status=FAILED, error=str(e), finished_at=time.time())
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,356 @@
+"""
+SaberWing Command - Pre-fork Worker Launcher
+Serve the Flask API from forked workers sharing warmed-up state
+
+The master process does all heavy imports, builds the Flask app, loads
+inventory and supplier data, warms the ML engine and request path, then
+freezes the garbage collector so the shared heap is not dirtied by
+collections. Workers are forked from that state and share its memory
+copy-on-write while accepting connections on one listening socket.
+
+Mutable state (background jobs, inventory versions, delta result
+hashes) lives in SQLite under a shared state directory rather than in
+the inherited heap, so every worker sees every write and job, and a
+restarted worker resumes from the latest committed state instead of
+the master's startup snapshot.
+
+Usage:
+    python3 launcher.py --workers 4 --port 5001
+    python3 launcher.py --workers 4 --state-dir /var/lib/saberwing
+    python3 launcher.py --report-only --startup-budget 2.0 --rss-budget 150
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+# Workers that exit within this many seconds of starting count as failed starts
+FAST_FAILURE_SECONDS = 5.0
+
+# Consecutive failed starts before the master gives up
+MAX_FAST_FAILURES = 5
+
+# Seconds between per-worker memory checks against --rss-budget
+RSS_CHECK_INTERVAL = 60.0
+
+# =========================================================================
+# STARTUP REPORT
+# =========================================================================
+
+def memory_usage_mb() -> Dict[str, float]:
+    """
+    Resident memory of the current process in MB
+
+    On Linux 'private' is the memory this process has dirtied itself,
+    i.e. what a forked worker costs beyond the shared master pages.
+    """
+
+    usage: Dict[str, float] = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+        usage['rss'] = fields.get('Rss', 0) / 1024.0
+        usage['shared'] = (fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)) / 1024.0
+        usage['private'] = (fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024.0
+    except OSError:
+        import resource
+        # ru_maxrss is KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage['rss'] = peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+    return usage
+
+
+def process_age_seconds() -> Optional[float]:
+    """Seconds since this process started (Linux), or None if unknown"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupReport:
+    """
+    Collects per-phase timings and checks them against budgets
+
+    Where the platform allows, the first phase covers interpreter startup
+    and the launcher's own imports, so the total is measured from
+    process start; otherwise the report says it excludes them.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[tuple] = []
+        self._last = self.started
+        self._before_start = process_age_seconds()
+        if self._before_start is not None:
+            self.phases.append(('interpreter + launcher imports', self._before_start))
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started + (self._before_start or 0.0)
+
+    def render(self, memory: Dict[str, float]) -> str:
+        lines = ['=' * 60, '⏱️  Startup Report', '=' * 60]
+        for phase, seconds in self.phases:
+            lines.append(f'  {phase:<32} {seconds * 1000:8.1f} ms')
+        label = 'total' if self._before_start is not None else 'total (excl. interpreter start)'
+        lines.append(f"  {label:<32} {self.total * 1000:8.1f} ms")
+        for key, value in memory.items():
+            lines.append(f"  {'master ' + key + ' memory':<32} {value:8.1f} MB")
+        lines.append('=' * 60)
+        return '\n'.join(lines)
+
+    def over_budget(
+        self,
+        memory: Dict[str, float],
+        startup_budget: Optional[float],
+        rss_budget: Optional[float],
+    ) -> List[str]:
+        problems = []
+        if startup_budget is not None and self.total > startup_budget:
+            problems.append(f'cold start {self.total:.2f}s exceeds budget {startup_budget:.2f}s')
+        if rss_budget is not None and memory.get('rss', 0) > rss_budget:
+            problems.append(f"RSS {memory['rss']:.1f}MB exceeds budget {rss_budget:.1f}MB")
+        return problems
+
+
+# =========================================================================
+# MASTER
+# =========================================================================
+
+def load_application(report: StartupReport) -> Any:
+    """Import, build and warm the Flask app in the master process"""
+
+    import numpy as np  # noqa: F401  (heaviest import, shared by every worker)
+    report.mark('import numpy')
+
+    import flask  # noqa: F401
+    import werkzeug.serving  # noqa: F401
+    report.mark('import flask/werkzeug')
+
+    # Builds the Flask app, ML engine, inventory store and job manager
+    import app as app_module
+    report.mark('build app + load data')
+
+    # Exercise every read path once so lazily-initialised state (route
+    # matching, JSON provider, snapshot indexes and derived totals) is
+    # created before forking and shared by all workers.
+    client = app_module.app.test_client()
+    client.get('/')
+    client.get('/api/suppliers')
+    client.get('/api/inventory')
+    client.get('/api/make-vs-buy')
+    client.post('/api/ml-predict', json={'macroParams': {}})
+    report.mark('warm engine + routes')
+
+    gc.collect()
+    gc.freeze()
+    report.mark('gc freeze')
+
+    return app_module.app
+
+
+def watch_worker_memory(index: int, rss_budget: float) -> None:
+    """Re-check a worker's private memory against the budget while it serves"""
+
+    while True:
+        time.sleep(RSS_CHECK_INTERVAL)
+        memory = memory_usage_mb()
+        used = memory.get('private', memory.get('rss', 0))
+        if used > rss_budget:
+            print(f'⚠️  Worker {index} private memory {used:.1f}MB exceeds budget {rss_budget:.1f}MB', flush=True)
+
+
+def serve_worker(application: Any, listener: socket.socket, index: int, rss_budget: Optional[float]) -> None:
+    """Worker body: serve requests from the shared socket"""
+
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    server = make_server(
+        *listener.getsockname()[:2],
+        application,
+        threaded=True,
+        fd=listener.fileno(),
+    )
+
+    memory = memory_usage_mb()
+    details = ', '.join(f'{key} {value:.1f}MB' for key, value in memory.items())
+    print(f'👷 Worker {index} (pid {os.getpid()}) ready: {details}', flush=True)
+
+    if rss_budget is not None:
+        threading.Thread(
+            target=watch_worker_memory,
+            args=(index, rss_budget),
+            name='saberwing-rss-check',
+            daemon=True,
+        ).start()
+
+    server.serve_forever()
+
+
+def spawn_worker(application: Any, listener: socket.socket, index: int, rss_budget: Optional[float]) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            serve_worker(application, listener, index, rss_budget)
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException as e:
+            print(f'❌ Worker {index} crashed: {e!r}', file=sys.stderr, flush=True)
+        finally:
+            os._exit(code)
+    return pid
+
+
+def supervise(application: Any, listener: socket.socket, workers: int, rss_budget: Optional[float]) -> int:
+    """
+    Fork workers, restart any that die, and stop them all on SIGINT/SIGTERM
+
+    A worker that dies within FAST_FAILURE_SECONDS of starting is
+    restarted after an exponential backoff; after MAX_FAST_FAILURES
+    consecutive fast failures the master stops and returns 1.
+    """
+
+    children: Dict[int, tuple] = {}
+    fast_failures = 0
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(workers):
+        children[spawn_worker(application, listener, index, rss_budget)] = (index, time.monotonic())
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        entry = children.pop(pid, None)
+        if entry is None or stopping:
+            continue
+
+        index, started = entry
+        if time.monotonic() - started < FAST_FAILURE_SECONDS:
+            fast_failures += 1
+        else:
+            fast_failures = 0
+
+        if fast_failures >= MAX_FAST_FAILURES:
+            print(f'❌ Worker {index} failed {fast_failures} times in a row at startup; giving up', flush=True)
+            stop()
+            continue
+
+        delay = min(0.5 * (2 ** (fast_failures - 1)), 10.0) if fast_failures else 0.0
+        print(f'🔁 Worker {index} (pid {pid}) exited with status {status}; restarting in {delay:.1f}s', flush=True)
+        time.sleep(delay)
+        if not stopping:
+            children[spawn_worker(application, listener, index, rss_budget)] = (index, time.monotonic())
+
+    return 1 if fast_failures >= MAX_FAST_FAILURES else 0
+
+
+# =========================================================================
+# MAIN
+# =========================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='SaberWing Command pre-fork launcher')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--state-dir', default=None,
+                        help='Directory for shared SQLite state (default: temporary, removed on exit)')
+    parser.add_argument('--startup-budget', type=float, default=None,
+                        help='Maximum master cold start in seconds')
+    parser.add_argument('--rss-budget', type=float, default=None,
+                        help='Maximum RSS in MB: master total at startup, worker private memory '
+                             f'at startup and every {RSS_CHECK_INTERVAL:.0f}s')
+    parser.add_argument('--report-only', action='store_true',
+                        help='Load and warm the app, print the startup report and exit')
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        print('--workers must be at least 1', file=sys.stderr)
+        return 2
+
+    if not hasattr(os, 'fork'):
+        print('Pre-fork launcher requires os.fork(); use app.py on this platform', file=sys.stderr)
+        return 1
+
+    report = StartupReport()
+
+    # Must be set before the app is imported; workers inherit it
+    state_dir = args.state_dir or tempfile.mkdtemp(prefix='saberwing-state-')
+    os.makedirs(state_dir, exist_ok=True)
+    os.environ['SABERWING_STATE_DIR'] = state_dir
+    try:
+        return serve(args, report)
+    finally:
+        if args.state_dir is None:
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def serve(args: argparse.Namespace, report: StartupReport) -> int:
+    application = load_application(report)
+
+    memory = memory_usage_mb()
+    print(report.render(memory), flush=True)
+
+    problems = report.over_budget(memory, args.startup_budget, args.rss_budget)
+    for problem in problems:
+        print(f'⚠️  {problem}', flush=True)
+
+    if args.report_only:
+        return 1 if problems else 0
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(128)
+    listener.set_inheritable(True)
+
+    print(f'📡 Server: http://{args.host}:{args.port} ({args.workers} worker{"s" if args.workers != 1 else ""})', flush=True)
+    return supervise(application, listener, args.workers, args.rss_budget)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,8 +7,10 @@ Tier 2: XGBoost Simulation - Quantity Calculation
 Tier 3: Quantile Regression - Lead Time Prediction
 """
 
+import json
+import zlib
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 
 class MLSimulationEngine:
@@ -32,7 +34,8 @@ class MLSimulationEngine:
         self, 
         flight_hours: float,
         test_phase: str,
-        criticality: str
+        criticality: str,
+        rng: Optional[np.random.Generator] = None
     ) -> bool:
         """
         Simulates Random Forest decision tree ensemble
@@ -46,6 +49,7 @@ class MLSimulationEngine:
             flight_hours: Cumulative flight test hours
             test_phase: 'Normal', 'High-G', 'Weapons', or 'Carrier'
             criticality: 'high', 'medium', or 'low'
+            rng: Random generator (defaults to the global numpy RNG)
         
         Returns:
             Boolean indicating if component needs to be ordered
@@ -79,7 +83,7 @@ class MLSimulationEngine:
         need_score *= multiplier
         
         # Add random forest variance (simulates ensemble voting)
-        variance = np.random.uniform(-0.1, 0.1)
+        variance = (rng or np.random).uniform(-0.1, 0.1)
         need_score += variance
         
         # Decision boundary at 0.5
@@ -94,7 +98,8 @@ class MLSimulationEngine:
         need_detected: bool,
         bom_explosion: float,
         historical_consumption: float,
-        criticality: str
+        criticality: str,
+        rng: Optional[np.random.Generator] = None
     ) -> int:
         """
         Simulates XGBoost gradient boosting for quantity prediction
@@ -109,6 +114,7 @@ class MLSimulationEngine:
             bom_explosion: Parts per aircraft multiplier
             historical_consumption: Average quarterly demand
             criticality: Component criticality level
+            rng: Random generator (defaults to the global numpy RNG)
         
         Returns:
             Recommended order quantity (integer)
@@ -131,7 +137,7 @@ class MLSimulationEngine:
         
         # Add XGBoost-style residual adjustments
         # Simulates boosting iterations improving predictions
-        residual = np.random.normal(0, 0.1) * base_quantity
+        residual = (rng or np.random).normal(0, 0.1) * base_quantity
         adjusted_quantity = base_quantity + residual
         
         # Round up to nearest integer
@@ -150,7 +156,8 @@ class MLSimulationEngine:
     def tier3_lead_time_prediction(
         self,
         base_lead_time_months: int,
-        conflict_index: float
+        conflict_index: float,
+        rng: Optional[np.random.Generator] = None
     ) -> int:
         """
         Quantile regression for lead time with exponential conflict scaling
@@ -166,6 +173,7 @@ class MLSimulationEngine:
         Args:
             base_lead_time_months: Normal lead time
             conflict_index: Geopolitical tension (1-10 scale)
+            rng: Random generator (defaults to the global numpy RNG)
         
         Returns:
             Predicted lead time in days
@@ -185,7 +193,7 @@ class MLSimulationEngine:
         lead_time_days = base_days * conflict_multiplier
         
         # Add supply chain variance (±15%)
-        variance_factor = np.random.uniform(0.85, 1.15)
+        variance_factor = (rng or np.random).uniform(0.85, 1.15)
         lead_time_days *= variance_factor
         
         # Quantile regression adjustment (simulate 75th percentile prediction)
@@ -238,7 +246,8 @@ class MLSimulationEngine:
     def run_full_analysis(
         self,
         inventory_items: List[Dict[str, Any]],
-        macro_params: Dict[str, Any]
+        macro_params: Dict[str, Any],
+        seed: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Execute complete 3-tier ML pipeline for all inventory items
@@ -246,6 +255,11 @@ class MLSimulationEngine:
         Args:
             inventory_items: List of component dictionaries
             macro_params: Macroeconomic parameters
+            seed: Makes the simulated variance reproducible. Each item
+                draws from its own generator seeded by this value and the
+                item's record, so identical inputs give identical rows
+                and unchanged items are unaffected by edits to others.
+                None uses the global numpy RNG.
         
         Returns:
             List of predictions with recommendations
@@ -260,11 +274,17 @@ class MLSimulationEngine:
         predictions = []
         
         for item in inventory_items:
+            rng = None
+            if seed is not None:
+                item_seed = zlib.crc32(json.dumps(item, sort_keys=True).encode('utf-8'))
+                rng = np.random.default_rng([seed, item_seed])
+            
             # TIER 1: Need Detection
             need_detected = self.tier1_need_detection(
                 flight_hours=flight_hours,
                 test_phase=test_phase,
-                criticality=item['criticality']
+                criticality=item['criticality'],
+                rng=rng
             )
             
             # TIER 2: Quantity Calculation
@@ -275,7 +295,8 @@ class MLSimulationEngine:
                 need_detected=need_detected,
                 bom_explosion=bom_explosion,
                 historical_consumption=historical_consumption,
-                criticality=item['criticality']
+                criticality=item['criticality'],
+                rng=rng
             )
             
             # MACRO ADJUSTMENT
@@ -288,7 +309,8 @@ class MLSimulationEngine:
             # TIER 3: Lead Time Prediction
             lead_time_days = self.tier3_lead_time_prediction(
                 base_lead_time_months=item['leadTimeBase'],
-                conflict_index=conflict_index
+                conflict_index=conflict_index,
+                rng=rng
             )
             
             # Calculate costs
@@ -0,0 +1,247 @@
+"""
+SaberWing Command - Delta Result Encoding
+Incremental and columnar responses for repeated ML predictions
+
+Every prediction result gets a content-derived resultId. The server keeps
+per-row hashes for recent results, so a client that sends the resultId of
+the result it already holds receives only the rows that changed. Rows can
+be encoded as JSON objects, JSON columns, or a compact binary columnar
+buffer.
+"""
+
+import hashlib
+import json
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from state_db import StateDatabase
+
+
+ENCODINGS = ('json', 'columnar', 'binary')
+
+BINARY_MIMETYPE = 'application/x-saberwing-columnar'
+BINARY_MAGIC = b'SWC1'
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    """Stable hash of a prediction row"""
+    payload = json.dumps(row, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def hash_rows(predictions: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Ordered (id, row hash) pairs for a prediction list"""
+    return [(row['id'], row_hash(row)) for row in predictions]
+
+
+def result_id(row_hashes: List[Tuple[str, str]], summary: Dict[str, Any]) -> str:
+    """Content id for a whole result (row order, row hashes and summary)"""
+    digest = hashlib.blake2b(digest_size=12)
+    for record_id, digest_value in row_hashes:
+        digest.update(f'{record_id}:{digest_value};'.encode('utf-8'))
+    digest.update(json.dumps(summary, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+RESULTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS result_hashes (
+    result_id TEXT PRIMARY KEY,
+    row_hashes TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+"""
+
+
+class ResultCache:
+    """
+    Bounded LRU map of resultId -> ordered (id, row hash) pairs
+
+    Only hashes are retained, never the rows themselves, so the cache
+    stays small even for large catalogs. Given a path the map lives in
+    SQLite, so a resultId issued by one worker process is recognised by
+    every other.
+
+    Args:
+        max_entries: Maximum number of results remembered
+        path: Optional SQLite database path for cross-process sharing
+    """
+
+    def __init__(self, max_entries: int = 256, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, List[Tuple[str, str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = StateDatabase(path, RESULTS_SCHEMA) if path is not None else None
+
+    def get(self, key: str) -> Optional[List[Tuple[str, str]]]:
+        if self._db is not None:
+            row = self._db.connection().execute(
+                'SELECT row_hashes FROM result_hashes WHERE result_id = ?', (key,)
+            ).fetchone()
+            return [tuple(pair) for pair in json.loads(row['row_hashes'])] if row else None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, row_hashes: List[Tuple[str, str]]) -> None:
+        if self._db is not None:
+            with self._db.write() as conn:
+                conn.execute(
+                    'INSERT INTO result_hashes (result_id, row_hashes, used_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT (result_id) DO UPDATE SET used_at = excluded.used_at',
+                    (key, json.dumps(row_hashes), time.time()),
+                )
+                conn.execute(
+                    'DELETE FROM result_hashes WHERE result_id IN ('
+                    'SELECT result_id FROM result_hashes ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,),
+                )
+            return
+
+        with self._lock:
+            self._entries[key] = row_hashes
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def build_response(
+    predictions: List[Dict[str, Any]],
+    summary: Dict[str, Any],
+    cache: ResultCache,
+    base_result_id: Optional[str] = None,
+    row_hashes: Optional[List[Tuple[str, str]]] = None,
+) -> Dict[str, Any]:
+    """
+    Build a full or delta prediction payload
+
+    Returns a dict with 'resultId' and 'delta'. For a delta (the base
+    result is still cached) 'predictions' holds only new or changed rows,
+    'removed' lists ids no longer present and 'order' is included only
+    when the row order differs from the base. Pass row_hashes (from
+    hash_rows) to skip re-hashing a result that has been built before;
+    an unknown or non-string base_result_id gives a full response.
+    """
+
+    if row_hashes is None:
+        row_hashes = hash_rows(predictions)
+    current_id = result_id(row_hashes, summary)
+    cache.put(current_id, row_hashes)
+
+    base = cache.get(base_result_id) if isinstance(base_result_id, str) else None
+    if base is None:
+        return {
+            'resultId': current_id,
+            'delta': False,
+            'predictions': predictions,
+            'summary': summary,
+        }
+
+    base_hashes = dict(base)
+    current_ids = [record_id for record_id, _ in row_hashes]
+    current_set = set(current_ids)
+
+    changed = [
+        row for row, (record_id, digest_value) in zip(predictions, row_hashes)
+        if base_hashes.get(record_id) != digest_value
+    ]
+
+    payload = {
+        'resultId': current_id,
+        'baseResultId': base_result_id,
+        'delta': True,
+        'predictions': changed,
+        'removed': [record_id for record_id, _ in base if record_id not in current_set],
+        'summary': summary,
+    }
+    if current_ids != [record_id for record_id, _ in base if record_id in current_set]:
+        payload['order'] = current_ids
+    return payload
+
+
+# =========================================================================
+# COLUMNAR ENCODINGS
+# =========================================================================
+
+def _column_type(values: List[Any]) -> str:
+    if all(isinstance(v, bool) for v in values):
+        return 'bool'
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return 'f64'
+    return 'json'
+
+
+def to_columns(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Transpose rows into {column: values}, preserving first-row key order"""
+    if not rows:
+        return {}
+    names = list(rows[0])
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+def encode_columnar(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the 'predictions' row list with a JSON column map"""
+    encoded = dict(payload)
+    encoded['predictions'] = {
+        'rowCount': len(payload['predictions']),
+        'columns': to_columns(payload['predictions']),
+    }
+    encoded['encoding'] = 'columnar'
+    return encoded
+
+
+def encode_binary(payload: Dict[str, Any]) -> bytes:
+    """
+    Encode a payload as a binary columnar buffer
+
+    Layout (little endian):
+        4 bytes   magic 'SWC1'
+        uint32    header length
+        header    UTF-8 JSON, padded with spaces to an 8-byte boundary
+        columns   numeric columns as float64 arrays, bool columns as
+                  uint8 arrays, each padded to an 8-byte boundary
+
+    The header carries every non-row field of the payload plus a column
+    directory of {name, type, offset, length}; offsets are relative to
+    the start of the column section. Columns that are not numeric or
+    boolean (e.g. component names) are stored inline in the header.
+    """
+
+    rows = payload['predictions']
+    columns = to_columns(rows)
+
+    directory = []
+    blobs = []
+    offset = 0
+    for name, values in columns.items():
+        kind = _column_type(values)
+        if kind == 'json':
+            directory.append({'name': name, 'type': 'json', 'values': values})
+            continue
+
+        data = array('d' if kind == 'f64' else 'B', [float(v) if kind == 'f64' else int(v) for v in values])
+        if sys.byteorder != 'little':
+            data.byteswap()
+        blob = data.tobytes()
+        blob += b'\0' * (-len(blob) % 8)
+
+        directory.append({'name': name, 'type': kind, 'offset': offset, 'length': len(values)})
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = {key: value for key, value in payload.items() if key != 'predictions'}
+    header['encoding'] = 'binary'
+    header['rowCount'] = len(rows)
+    header['columns'] = directory
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-(len(header_bytes) + 8) % 8)
+
+    return BINARY_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes + b''.join(blobs)
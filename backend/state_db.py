@@ -0,0 +1,54 @@
+"""
+SaberWing Command - Shared State Database
+SQLite storage for state shared between worker processes
+
+Jobs, inventory snapshots and delta result hashes live in SQLite files
+under one state directory so every forked worker (and a restarted one)
+sees the same data. Connections are opened per thread and per process;
+a connection inherited across fork() is never reused.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class StateDatabase:
+    """
+    SQLite database in WAL mode with per-thread, fork-aware connections
+
+    Args:
+        path: Database file path
+        schema: SQL script creating tables (must be idempotent)
+    """
+
+    def __init__(self, path: str, schema: str):
+        self.path = path
+        self._local = threading.local()
+        self.connection().executescript(schema)
+
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the calling thread in the current process"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that serialises writers across processes"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
@@ -0,0 +1,162 @@
+"""
+Versioned inventory store checks
+
+Run from backend/: python -m pytest -q
+"""
+
+import pytest
+
+from app import app
+from inventory_store import InventoryStore, VersionConflict
+
+
+ITEM = {
+    'id': 'engines',
+    'component': 'GE F414 Engine Cores',
+    'supplier': 'GE Aerospace',
+    'currentStock': 45,
+    'minStock': 20,
+    'unitCost': 5000000,
+    'storageCostPerDay': 1200,
+    'leadTimeBase': 18,
+    'criticality': 'high',
+}
+
+SUPPLIER = {
+    'id': 'ge',
+    'name': 'GE Aerospace',
+    'component': 'F414 Engine Cores',
+    'unitCost': 5000000,
+    'leadTime': 18,
+    'status': 'active',
+    'contractValue': 250000000,
+    'location': 'Lynn, MA',
+}
+
+
+def make_store():
+    return InventoryStore([ITEM], [SUPPLIER])
+
+
+def test_real_change_bumps_version():
+    store = make_store()
+
+    snapshot = store.apply(inventory_changes=[{'id': 'engines', 'currentStock': 50}])
+
+    assert snapshot.version == 2
+    assert store.current() is snapshot
+    assert snapshot.inventory_by_id['engines']['currentStock'] == 50
+    assert snapshot.total_inventory_value == 50 * ITEM['unitCost']
+
+
+def test_noop_write_keeps_version():
+    store = make_store()
+    before = store.current()
+
+    assert store.apply(inventory_changes=[{'id': 'engines'}]) is before
+    assert store.apply(inventory_changes=[{'id': 'engines', 'currentStock': 45}]) is before
+    assert store.version == 1
+
+
+def test_stale_expected_version_conflicts():
+    store = make_store()
+    store.apply(inventory_changes=[{'id': 'engines', 'currentStock': 50}])
+
+    with pytest.raises(VersionConflict):
+        store.apply(inventory_changes=[{'id': 'engines', 'currentStock': 51}], expected_version=1)
+    assert store.apply(
+        inventory_changes=[{'id': 'engines', 'currentStock': 51}], expected_version=(1, 2)
+    ).version == 3
+
+
+def test_put_requires_all_fields():
+    store = make_store()
+
+    with pytest.raises(ValueError, match='missing fields'):
+        store.apply(inventory_changes=[{'id': 'engines', 'currentStock': 3}], replace=True)
+    assert store.version == 1
+
+
+def test_pinned_snapshot_unchanged_by_later_write():
+    store = make_store()
+    pinned = store.current()
+    total = pinned.total_inventory_value
+
+    store.apply(
+        inventory_changes=[{'id': 'engines', 'currentStock': 1}],
+        supplier_changes=[{'id': 'ge', 'leadTime': 30}],
+    )
+
+    assert pinned.version == 1
+    assert pinned.inventory_by_id['engines']['currentStock'] == 45
+    assert pinned.suppliers_by_id['ge']['leadTime'] == 18
+    assert pinned.total_inventory_value == total
+
+
+@pytest.mark.parametrize('change', [
+    {'id': 'engines', 'currentStock': 10 ** 400},
+    {'id': 'engines', 'unitCost': float('nan')},
+    {'id': 'engines', 'unitCost': float('inf')},
+    {'id': 'engines', 'criticality': 'extreme'},
+    {'id': ['engines']},
+    {'id': {'a': 1}},
+])
+def test_invalid_changes_rejected(change):
+    store = make_store()
+
+    with pytest.raises(ValueError):
+        store.apply(inventory_changes=[change])
+    assert store.version == 1
+
+
+def test_api_rejects_bad_ids_and_stale_if_match():
+    client = app.test_client()
+
+    assert client.patch('/api/inventory', json={'updates': [{'id': {'a': 1}}]}).status_code == 400
+    assert client.patch('/api/inventory', json={'updates': [{'id': ['x']}]}).status_code == 400
+    assert client.patch('/api/inventory/engines', json={'currentStock': 10 ** 400}).status_code == 400
+
+    stale = client.patch('/api/inventory/engines', json={'currentStock': 45}, headers={'If-Match': '"0"'})
+    assert stale.status_code == 409
+
+
+def test_api_if_match_forms_and_deduplicated_updates():
+    client = app.test_client()
+    version = client.get('/api/inventory').get_json()['version']
+
+    for header in ('*', f'W/"{version}"', f'"0", "{version}"'):
+        response = client.patch('/api/inventory/engines', json={}, headers={'If-Match': header})
+        assert response.status_code == 200, header
+    assert client.patch('/api/inventory/engines', json={}, headers={'If-Match': 'abc'}).status_code == 400
+
+    response = client.patch('/api/inventory', json={'updates': [
+        {'id': 'engines', 'currentStock': 45},
+        {'id': 'engines', 'minStock': 20},
+    ]})
+    assert [record['id'] for record in response.get_json()['updated']] == ['engines']
+
+
+def test_stores_sharing_a_database_see_each_others_writes(tmp_path):
+    path = str(tmp_path / 'inventory.sqlite3')
+    first = InventoryStore([ITEM], [SUPPLIER], path=path)
+    second = InventoryStore([ITEM], [SUPPLIER], path=path)
+
+    first.apply(inventory_changes=[{'id': 'engines', 'currentStock': 99}])
+
+    assert second.current().version == 2
+    assert second.current().inventory_by_id['engines']['currentStock'] == 99
+    with pytest.raises(VersionConflict):
+        second.apply(inventory_changes=[{'id': 'engines', 'currentStock': 1}], expected_version=1)
+
+
+def test_reopened_store_resumes_latest_version(tmp_path):
+    path = str(tmp_path / 'inventory.sqlite3')
+    InventoryStore([ITEM], [SUPPLIER], path=path).apply(
+        inventory_changes=[{'id': 'engines', 'currentStock': 99}]
+    )
+
+    reopened = InventoryStore([ITEM], [SUPPLIER], path=path)
+
+    assert reopened.current().version == 2
+    assert reopened.current().inventory_by_id['engines']['currentStock'] == 99
+    assert reopened.apply(inventory_changes=[{'id': 'engines', 'currentStock': 98}]).version == 3
@@ -0,0 +1,89 @@
+"""
+Background job API checks
+
+Run from backend/: python -m pytest -q
+"""
+
+import json
+import time
+
+from app import app
+from jobs import JobManager
+
+
+MACRO_PARAMS = {'conflictIndex': 7, 'flightHours': 350}
+
+
+def wait_for_status(client, job_id, statuses, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').get_json()
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} did not reach {statuses}')
+
+
+def test_submit_poll_complete():
+    client = app.test_client()
+
+    submitted = client.post('/api/jobs', json={'macroParams': MACRO_PARAMS, 'chunkSize': 2})
+    assert submitted.status_code == 202
+    job_id = submitted.get_json()['jobId']
+
+    job = wait_for_status(client, job_id, ('completed', 'failed'))
+    assert job['status'] == 'completed'
+    assert job['progress']['completed'] == job['progress']['total'] == 6
+    assert [len(p['predictions']) for p in job['partial']] == [2, 2, 2]
+    assert len(job['result']['predictions']) == 6
+
+    # A poll from the final cursor carries no partials
+    tail = client.get(f"/api/jobs/{job_id}?since={job['partialCursor']}").get_json()
+    assert tail['partial'] == []
+
+
+def test_cancel_running_job():
+    client = app.test_client()
+    job_id = client.post('/api/jobs', json={'macroParams': MACRO_PARAMS, 'runs': 1000}).get_json()['jobId']
+
+    cancelled = client.delete(f'/api/jobs/{job_id}')
+    assert cancelled.status_code == 200
+
+    job = wait_for_status(client, job_id, ('cancelled', 'completed', 'failed'))
+    assert job['status'] == 'cancelled'
+    assert 'result' not in job
+
+
+def test_event_stream_ends_with_done():
+    client = app.test_client()
+    job_id = client.post('/api/jobs', json={'macroParams': MACRO_PARAMS}).get_json()['jobId']
+
+    body = client.get(f'/api/jobs/{job_id}/events').get_data(as_text=True)
+    events = [block for block in body.split('\n\n') if block]
+
+    assert events[-1].startswith('event: done')
+    done = json.loads(events[-1].split('data: ', 1)[1])
+    assert done['status'] == 'completed'
+    streamed = sum(len(json.loads(e.split('data: ', 1)[1])['partial']) for e in events)
+    assert streamed == done['partialCursor']
+
+
+def test_finished_jobs_expire():
+    manager = JobManager(max_workers=1, ttl_seconds=0.05)
+    job = manager.submit('test', {}, lambda job: iter([{'completed': 1, 'total': 1}]))
+
+    deadline = time.time() + 5
+    while manager.get(job.id).status != 'completed' and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    assert manager.get(job.id) is None
+
+
+def test_invalid_submissions_rejected():
+    client = app.test_client()
+
+    assert client.post('/api/jobs', json={'macroParams': []}).status_code == 400
+    assert client.post('/api/jobs', json={'macroParams': {'conflictIndex': 'x'}}).status_code == 400
+    assert client.post('/api/jobs', json={'macroParams': {}, 'runs': True}).status_code == 400
+    assert client.get('/api/jobs/missing').status_code == 404
@@ -0,0 +1,60 @@
+"""
+Delta response checks for /api/ml-predict
+
+Run from backend/: python -m pytest -q
+"""
+
+from app import app, inventory_store
+
+
+MACRO_PARAMS = {
+    'conflictIndex': 7,
+    'inflationRate': 5.5,
+    'defenseBudget': 120,
+    'flightHours': 350,
+    'testPhase': 'High-G',
+}
+
+
+def predict(client, **body):
+    response = client.post('/api/ml-predict', json={'macroParams': MACRO_PARAMS, **body})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_unchanged_rerun_returns_empty_delta():
+    client = app.test_client()
+    first = predict(client)
+
+    rerun = predict(client, baseResultId=first['resultId'])
+
+    assert rerun['delta'] is True
+    assert rerun['resultId'] == first['resultId']
+    assert rerun['predictions'] == []
+    assert rerun['removed'] == []
+    assert 'order' not in rerun
+    assert rerun['summary'] == first['summary']
+
+
+def test_inventory_update_returns_only_changed_row():
+    client = app.test_client()
+    first = predict(client)
+    engines = inventory_store.current().inventory_by_id['engines']
+
+    try:
+        client.patch('/api/inventory/engines', json={'currentStock': engines['currentStock'] + 1})
+        delta = predict(client, baseResultId=first['resultId'])
+    finally:
+        client.patch('/api/inventory/engines', json={'currentStock': engines['currentStock']})
+
+    assert delta['delta'] is True
+    assert [row['id'] for row in delta['predictions']] == ['engines']
+
+
+def test_non_string_base_result_id_returns_full_result():
+    client = app.test_client()
+
+    result = predict(client, baseResultId=['a'])
+
+    assert result['delta'] is False
+    assert len(result['predictions']) == len(inventory_store.current().inventory)
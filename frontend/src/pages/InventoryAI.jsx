@@ -30,7 +30,7 @@ const InventoryAI = () => {
     const runAnalysis = async () => {
         setLoading(true);
         try {
-            const result = await api.runMLPrediction(macroParams);
+            const result = await api.runMLPrediction(macroParams, predictions);
             console.log('API RESPONSE IN FRONTEND:', result);
             setPredictions(result);
         } catch (error) {
@@ -2,6 +2,54 @@ import axios from 'axios';
 
 const API_BASE_URL = 'http://127.0.0.1:5001';
 
+// Expand {columns: {name: values}} back into row objects
+const columnsToRows = (rowCount, columns) => {
+    const names = Object.keys(columns);
+    return Array.from({ length: rowCount }, (_, i) => {
+        const row = {};
+        names.forEach(name => { row[name] = columns[name][i]; });
+        return row;
+    });
+};
+
+const decodeColumnar = (data) => {
+    if (data.encoding !== 'columnar') return data;
+    const { rowCount, columns } = data.predictions;
+    return { ...data, predictions: columnsToRows(rowCount, columns) };
+};
+
+// Decode the 'SWC1' binary columnar buffer (see backend/result_delta.py)
+const decodeBinaryColumnar = (buffer) => {
+    const view = new DataView(buffer);
+    const headerLength = view.getUint32(4, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+    const base = 8 + headerLength;
+
+    const columns = {};
+    header.columns.forEach(col => {
+        if (col.type === 'json') {
+            columns[col.name] = col.values;
+        } else if (col.type === 'f64') {
+            columns[col.name] = Array.from(new Float64Array(buffer.slice(base + col.offset, base + col.offset + col.length * 8)));
+        } else {
+            columns[col.name] = Array.from(new Uint8Array(buffer, base + col.offset, col.length), v => v === 1);
+        }
+    });
+
+    const { columns: _directory, rowCount, ...rest } = header;
+    return { ...rest, predictions: columnsToRows(rowCount, columns) };
+};
+
+// Merge a delta response into the previous full result
+const applyDelta = (previous, delta) => {
+    const rows = new Map(previous.predictions.map(row => [row.id, row]));
+    delta.removed.forEach(id => rows.delete(id));
+    delta.predictions.forEach(row => rows.set(row.id, row));
+    // The server sends 'order' whenever rows were added or reordered
+    const order = delta.order || previous.predictions.map(row => row.id).filter(id => rows.has(id));
+    return { ...delta, delta: false, predictions: order.map(id => rows.get(id)) };
+};
+
 export const api = {
     // Get all suppliers
     getSuppliers: async () => {
@@ -22,10 +70,54 @@ export const api = {
     },
 
     // Run ML prediction
-    runMLPrediction: async (macroParams) => {
+    // Pass the previous result to receive only changed rows; the delta is
+    // merged here so callers always get a full result back.
+    runMLPrediction: async (macroParams, previous = null, encoding = 'json') => {
         const response = await axios.post(`${API_BASE_URL}/api/ml-predict`, {
             macroParams,
+            baseResultId: previous ? previous.resultId : undefined,
+            encoding,
+        }, {
+            responseType: encoding === 'binary' ? 'arraybuffer' : 'json',
+        });
+        const data = encoding === 'binary'
+            ? decodeBinaryColumnar(response.data)
+            : decodeColumnar(response.data);
+        return data.delta ? applyDelta(previous, data) : data;
+    },
+
+    // Submit long-running ML analysis as a background job
+    submitMLJob: async (macroParams, options = {}) => {
+        const response = await axios.post(`${API_BASE_URL}/api/jobs`, {
+            macroParams,
+            ...options,
+        });
+        return response.data;
+    },
+
+    // Poll background job status; pass the previous poll's partialCursor
+    // as `since` to receive only partial results published after it
+    getJob: async (jobId, since = 0) => {
+        const response = await axios.get(`${API_BASE_URL}/api/jobs/${jobId}`, {
+            params: { since },
         });
         return response.data;
     },
+
+    // Cancel background job
+    cancelJob: async (jobId) => {
+        const response = await axios.delete(`${API_BASE_URL}/api/jobs/${jobId}`);
+        return response.data;
+    },
+
+    // Subscribe to job progress (Server-Sent Events)
+    subscribeToJob: (jobId, { onProgress, onDone }) => {
+        const source = new EventSource(`${API_BASE_URL}/api/jobs/${jobId}/events`);
+        source.addEventListener('progress', (e) => onProgress && onProgress(JSON.parse(e.data)));
+        source.addEventListener('done', (e) => {
+            source.close();
+            onDone && onDone(JSON.parse(e.data));
+        });
+        return () => source.close();
+    },
 };